@@ -2,6 +2,10 @@ from __future__ import annotations
 
 """DataFrame numeric coercion helpers."""
 
+import ast
+from typing import Any
+
+import numpy as np
 import pandas as pd
 
 
@@ -20,3 +24,74 @@ def coerce_numeric_like(df: pd.DataFrame) -> pd.DataFrame:
             out[column] = converted
     return out
 
+
+_FAST_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div)
+
+
+def _fast_columns(expr: str) -> tuple[list[str], bool] | None:
+    """Return the columns and whether ``/`` appears if ``expr`` is plain arithmetic.
+
+    Only ``df['col']`` subscripts, numeric constants, unary ``+``/``-`` and the
+    binary ``+ - * /`` operators qualify. Anything else (method calls, ``//``,
+    ``%``, comparisons, other names) returns ``None`` so the caller keeps full
+    pandas semantics.
+    """
+
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError:
+        return None
+    cols: list[str] = []
+    has_div = False
+    stack: list[ast.AST] = [tree.body]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.BinOp) and isinstance(node.op, _FAST_OPS):
+            has_div = has_div or isinstance(node.op, ast.Div)
+            stack.extend((node.left, node.right))
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+            stack.append(node.operand)
+        elif isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                return None
+        elif (
+            isinstance(node, ast.Subscript)
+            and isinstance(node.value, ast.Name)
+            and node.value.id == "df"
+            and isinstance(node.slice, ast.Constant)
+            and isinstance(node.slice.value, str)
+        ):
+            cols.append(node.slice.value)
+        else:
+            return None
+    return (cols, has_div) if cols else None
+
+
+def eval_formula(expr: str, df: pd.DataFrame) -> Any:
+    """Evaluate a ``df['col']`` formula against ``df``.
+
+    Plain column arithmetic (``+ - * /`` over numeric columns and constants)
+    runs over raw NumPy arrays, skipping pandas index alignment on each
+    operator. Any other expression is evaluated against ``df`` itself.
+    """
+
+    fast = _fast_columns(expr)
+    if fast is not None and df.columns.is_unique:
+        cols, has_div = fast
+        if all(
+            c in df.columns
+            and isinstance(df[c].dtype, np.dtype)
+            and df[c].dtype.kind in "iuf"
+            for c in cols
+        ):
+            # Division promotes to float64 up front, matching pandas' inf/NaN
+            dtype = "float64" if has_div else None
+            arrays = {c: df[c].to_numpy(dtype=dtype) for c in cols}
+            try:
+                with np.errstate(all="ignore"):
+                    res = eval(expr, {"df": arrays})  # noqa: S307 – user code
+            except Exception:  # noqa: BLE001 – retry with full pandas semantics
+                pass
+            else:
+                return pd.Series(res, index=df.index)
+    return eval(expr, {"df": df})  # noqa: S307 – user code
@@ -6,7 +6,7 @@ from typing import Any
 
 import pandas as pd
 
-from app_utils.dataframe_numeric import coerce_numeric_like
+from app_utils.dataframe_numeric import coerce_numeric_like, eval_formula
 
 
 def apply_header_mappings(df: pd.DataFrame, template: Any) -> pd.DataFrame:
@@ -24,7 +24,7 @@ def apply_header_mappings(df: pd.DataFrame, template: Any) -> pd.DataFrame:
             if expr:
                 # Expressions take precedence over ``source`` when provided.
                 numeric_out = coerce_numeric_like(out)
-                out[field.key] = eval(expr, {"df": numeric_out})  # controlled templates
+                out[field.key] = eval_formula(expr, numeric_out)  # controlled templates
             elif src and src in out.columns:
                 # Copy values to the destination key without removing the original
                 out[field.key] = out[src]
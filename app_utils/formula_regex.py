@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+"""Shared regular expressions for ``df['col']`` formula expressions."""
+
+import re
+
+DF_COL_RE = re.compile(r"df\['([^']+)'\]")
+"""Match a ``df['col']`` reference, capturing the column name."""
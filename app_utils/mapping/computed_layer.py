@@ -28,6 +28,8 @@ import re
 import pandas as pd
 from openai import OpenAI
 
+from app_utils.formula_regex import DF_COL_RE
+
 
 def _direct_available(df: pd.DataFrame, candidates: List[str]) -> str | None:
     for col in candidates:
@@ -127,7 +129,7 @@ def _convert_expression(expr: str) -> tuple[str, Dict[str, List[str]]]:
         deps[col] = [col]
         return f"${col}"
 
-    new_expr = re.sub(r"df\['([^']+)'\]", repl, expr)
+    new_expr = DF_COL_RE.sub(repl, expr)
     return new_expr, deps
 
 
@@ -14,9 +14,13 @@ def _apply_header_expressions(layer: Dict[str, Any], idx: int, state: MutableMap
 
     # include any extra fields added by the user
     extras = state.get(f"header_extra_fields_{idx}", [])
-    for name in extras:
-        if not any(f.get("key") == name for f in new_layer.get("fields", [])):
-            new_layer.setdefault("fields", []).append({"key": name, "required": False})
+    if extras:
+        fields = new_layer.setdefault("fields", [])
+        existing = {f.get("key") for f in fields}
+        for name in extras:
+            if name not in existing:
+                fields.append({"key": name, "required": False})
+                existing.add(name)
 
     for field in new_layer.get("fields", []):
         info = mapping.get(field["key"], {})
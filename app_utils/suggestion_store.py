@@ -7,6 +7,8 @@ Key functions
 -------------
 ``add_suggestion``
     Persist a new suggestion if it doesn't already exist.
+``bulk_add_suggestions``
+    Persist several suggestions with a single load and save.
 ``get_suggestions``
     Return all suggestions for a template field.
 ``get_suggestion``
@@ -94,16 +96,15 @@ def _is_adhoc(field: str) -> bool:
     return field.upper().startswith("ADHOC_INFO")
 
 
-def add_suggestion(s: Suggestion, headers: Optional[List[str]] | None = None) -> None:
-    if _is_adhoc(s["field"]):
-        return
-    data = _load()
+def _merge_suggestion(
+    data: List[Suggestion], s: Suggestion, headers: Optional[List[str]], now: str
+) -> None:
+    """Insert ``s`` into ``data`` or refresh the matching existing entry."""
     t_c = _canon(s["template"])
     f_c = _canon(s["field"])
     cols_c = [_canon(c) for c in s.get("columns", [])]
     display_c = _canon(s.get("display", ""))
     h_id = s.get("header_id") or _headers_id(headers)
-    now = datetime.now(timezone.utc).isoformat()
     for i, existing in enumerate(data):
         if (
             _canon(existing["template"]) == t_c
@@ -118,13 +119,33 @@ def add_suggestion(s: Suggestion, headers: Optional[List[str]] | None = None) ->
                 updated["header_id"] = h_id
             updated["added"] = now
             data[i] = updated
-            _save(data)
             return
     new_s = dict(s)
     if h_id:
         new_s["header_id"] = h_id
     new_s["added"] = now
     data.append(new_s)
+
+
+def add_suggestion(s: Suggestion, headers: Optional[List[str]] | None = None) -> None:
+    if _is_adhoc(s["field"]):
+        return
+    data = _load()
+    _merge_suggestion(data, s, headers, datetime.now(timezone.utc).isoformat())
+    _save(data)
+
+
+def bulk_add_suggestions(
+    suggestions: List[Suggestion], headers: Optional[List[str]] | None = None
+) -> None:
+    """Persist ``suggestions`` with one load and one save of the store."""
+    pending = [s for s in suggestions if not _is_adhoc(s["field"])]
+    if not pending:
+        return
+    data = _load()
+    now = datetime.now(timezone.utc).isoformat()
+    for s in pending:
+        _merge_suggestion(data, s, headers, now)
     _save(data)
 
 
@@ -6,15 +6,16 @@ Buttons live inside the dialog; clicks are detected because their keys
 are stable.  “Clear” refreshes in-place, “Save” persists & closes.
 """
 
-import math
-import re
+import ast
 import uuid
+from functools import partial
 from typing import List
 
 import pandas as pd
 import streamlit as st
 
-from app_utils.dataframe_numeric import coerce_numeric_like
+from app_utils.dataframe_numeric import coerce_numeric_like, eval_formula
+from app_utils.formula_regex import DF_COL_RE
 from app_utils.suggestion_store import add_suggestion
 
 # ─────────────────────────── configuration ────────────────────────────
@@ -22,15 +23,20 @@ OPS_DISPLAY_MAP = {r"\+": "+", r"\-": "-", r"\*": "*", "/": "/", "(": "(", ")":
 OPS: List[str] = list(OPS_DISPLAY_MAP.keys())
 
 RETURN_KEY_TEMPLATE = "formula_expr_{key}"
-ROW_CAPACITY = 5  # pill grid width units
+PREVIEW_ROWS = 200  # rows evaluated for the live preview
 
 
-# ─────────────────────────── helpers ──────────────────────────────────
-def _token_units(tok: str) -> int:
-    actual = OPS_DISPLAY_MAP.get(tok, tok)
-    if actual in {"+", "-", "*", "/"}:
-        return 1
-    return min(3, max(1, math.ceil(len(actual) / 12)))
+def _needs_full_frame(expr: str) -> bool:
+    """Return ``True`` when ``expr`` calls a method, e.g. ``df['A'].sum()``.
+
+    Reductions and other method calls depend on every row, so their preview
+    cannot be computed from the head alone.
+    """
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError:
+        return False
+    return any(isinstance(n, (ast.Call, ast.Attribute)) for n in ast.walk(tree))
 
 
 # ─────────────────────────── main entrypoint ──────────────────────────
@@ -38,7 +44,8 @@ def open_formula_dialog(df: pd.DataFrame, dialog_key: str) -> None:
     """Open the modal formula builder (gear-icon handler)."""
     result_key = RETURN_KEY_TEMPLATE.format(key=dialog_key)
     expr_key = f"{dialog_key}_expr_text"
-    numeric_df = coerce_numeric_like(df)
+    hash_key = f"{dialog_key}_last_expr_hash"
+    preview_key = f"{dialog_key}_last_preview"
 
     # Prefill on first open each run
     if result_key in st.session_state and expr_key not in st.session_state:
@@ -50,25 +57,23 @@ def open_formula_dialog(df: pd.DataFrame, dialog_key: str) -> None:
         frag = f" df['{token}'] " if token not in OPS else f" {actual} "
         st.session_state[expr_key] += frag
 
-    def _render_row(tokens: List[str]) -> None:
-        if not tokens:
-            return
-        cols = st.columns([_token_units(t) for t in tokens])
+    def _render_pills(tokens: tuple[str, ...]) -> None:
+        # One wrapping flex container instead of a st.columns row per line
+        pills = st.container(horizontal=True, gap="small")
         for i, tok in enumerate(tokens):
-            cols[i].button(
+            pills.button(
                 tok,
                 key=f"{dialog_key}_{tok}_{i}",
-                on_click=_append_token,
-                args=(tok,),
+                on_click=partial(_append_token, tok),
             )
 
     def _valid(e: str) -> bool:
-        return (
-            e
-            and e.rstrip()[-1] not in {"+", "-", "*", "/", "("}
-            and not e.endswith("df[")
-        )
-        
+        # Walk back over trailing whitespace instead of copying via rstrip()
+        end = len(e) - 1
+        while end >= 0 and e[end].isspace():
+            end -= 1
+        return end >= 0 and e[end] not in "+-*/(" and not e.endswith("df[")
+
     def reset_expr():
         st.session_state[expr_key] = ""
 
@@ -76,19 +81,34 @@ def open_formula_dialog(df: pd.DataFrame, dialog_key: str) -> None:
         if not _valid(e):
             st.info("Build your expression or click tokens above.")
             return bool(e)
+        # Reruns that leave the expression and data untouched reuse the
+        # cached preview; the content hash catches a new upload with the same
+        # columns and row count. Only the referenced columns are hashed.
+        head = df if _needs_full_frame(e) else df.head(PREVIEW_ROWS)
+        used = [c for c in dict.fromkeys(DF_COL_RE.findall(e)) if c in head.columns]
+        data_hash = int(pd.util.hash_pandas_object(head[used]).sum()) if used else 0
+        expr_hash = hash((e, tuple(df.columns), len(df), data_hash))
+        if st.session_state.get(hash_key) == expr_hash:
+            st.dataframe(st.session_state[preview_key], use_container_width=True)
+            return True
         try:
-            res = eval(e, {"df": numeric_df})          # noqa: S307 – user code
+            # Plain arithmetic only needs the displayed head; method calls
+            # such as reductions see the full frame, as they will on export
+            sample = coerce_numeric_like(head)
+            res = eval_formula(e, sample)
             if not isinstance(res, pd.Series):
-                res = pd.Series([res] * len(df))
-            st.dataframe(
-                pd.DataFrame({"Result": res}).head(),
-                use_container_width=True,
-            )
+                res = pd.Series([res] * len(sample))
+            preview = pd.DataFrame({"Result": res}).head()
+            st.session_state[hash_key] = expr_hash
+            st.session_state[preview_key] = preview
+            st.dataframe(preview, use_container_width=True)
             return True
         except Exception as exc:                        # noqa: BLE001
             st.error(f"❌ {exc}")
             return False
 
+    tokens = tuple(df.columns) + tuple(OPS)
+
     # ════════════════════════ dialog definition ═══════════════════════
     @st.dialog(f"Build Formula for '{dialog_key}'", width="large")
     def _dialog() -> None:
@@ -96,21 +116,13 @@ def open_formula_dialog(df: pd.DataFrame, dialog_key: str) -> None:
 
         # CSS to keep pills tidy
         st.markdown(
-            "<style>.stButton>button{white-space:nowrap;margin:0 0.25rem 0.25rem 0}</style>",
+            "<style>.stButton>button{white-space:nowrap}</style>",
             unsafe_allow_html=True,
         )
         st.markdown("#### Click a token or type directly:")
 
-        # ── token pills grid ──
-        row, units = [], 0
-        for token in list(df.columns) + OPS:
-            u = _token_units(token)
-            if units + u > ROW_CAPACITY:
-                _render_row(row)
-                row, units = [], 0
-            row.append(token)
-            units += u
-        _render_row(row)
+        # ── token pills ──
+        _render_pills(tokens)
 
         # ── editor ──
         st.text_area("Formula", key=expr_key, height=150)
@@ -126,7 +138,7 @@ def open_formula_dialog(df: pd.DataFrame, dialog_key: str) -> None:
 
         if col_save.button("💾 Save", key=f"{dialog_key}_save", disabled=not save_ready):
             st.session_state[result_key] = expr
-            st.session_state[f"{result_key}_display"] = re.sub(r"df\['([^']+)'\]", r"\1", expr)
+            st.session_state[f"{result_key}_display"] = DF_COL_RE.sub(r"\1", expr)
 
             if not dialog_key.upper().startswith("ADHOC_INFO"):
                 add_suggestion(
@@ -135,12 +147,13 @@ def open_formula_dialog(df: pd.DataFrame, dialog_key: str) -> None:
                         "field": dialog_key,
                         "type": "formula",
                         "formula": expr,
-                        "columns": re.findall(r"df\['([^']+)'\]", expr),
+                        "columns": DF_COL_RE.findall(expr),
                         "display": st.session_state[f"{result_key}_display"],
                     },
                     headers=list(df.columns),
                 )
-            st.session_state.pop(expr_key, None)
+            for k in (expr_key, hash_key, preview_key):
+                st.session_state.pop(k, None)
             st.rerun()  # closes modal
 
     _dialog()  # ← actually displays the modal
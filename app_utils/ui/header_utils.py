@@ -2,9 +2,9 @@ from __future__ import annotations
 
 """Helper functions for the header mapping UI."""
 
-import re
 import streamlit as st
-from app_utils.suggestion_store import add_suggestion, remove_suggestion
+from app_utils.formula_regex import DF_COL_RE
+from app_utils.suggestion_store import bulk_add_suggestions, remove_suggestion
 from app_utils.template_builder import (
     build_lookup_layer,
     build_computed_layer,
@@ -36,6 +36,26 @@ def remove_formula(field_key: str, idx: int, drop_suggestion: bool = False) -> N
         remove_suggestion(tpl, field_key, "formula")
 
 
+def _field_keys(layer: dict, idx: int) -> dict:
+    """Return the session's key index for ``layer['fields']``.
+
+    The index is rebuilt whenever the fields list is replaced or changes
+    length outside :func:`add_field` / :func:`remove_field`, which keep it in
+    step themselves.
+    """
+    fields = layer.setdefault("fields", [])
+    index_key = f"header_field_keys_{idx}"
+    index = st.session_state.get(index_key)
+    if index is None or index["fields"] is not fields or index["len"] != len(fields):
+        index = {
+            "fields": fields,
+            "len": len(fields),
+            "keys": {f.get("key") for f in fields},
+        }
+        st.session_state[index_key] = index
+    return index
+
+
 def remove_field(field_key: str, idx: int) -> None:
     """Delete a user-added field from session state."""
     map_key = f"header_mapping_{idx}"
@@ -44,15 +64,23 @@ def remove_field(field_key: str, idx: int) -> None:
     mapping.pop(field_key, None)
     st.session_state[map_key] = mapping
     extras = st.session_state.get(extra_key, [])
-    if field_key in extras:
+    try:
         extras.remove(field_key)
+    except ValueError:
+        pass
+    else:
         st.session_state[extra_key] = extras
     tpl = st.session_state.get("template")
     if tpl:
-        layer = tpl["layers"][idx]
-        layer["fields"] = [
-            f for f in layer.get("fields", []) if f.get("key") != field_key
-        ]
+        index = _field_keys(tpl["layers"][idx], idx)
+        if field_key in index["keys"]:
+            fields = index["fields"]
+            pos = next(i for i, f in enumerate(fields) if f.get("key") == field_key)
+            del fields[pos]
+            # a loaded template may repeat a key; the rest of the scan finds it
+            if all(f.get("key") != field_key for f in fields[pos:]):
+                index["keys"].discard(field_key)
+            index["len"] = len(fields)
         st.session_state["template"] = tpl
     st.session_state["unsaved_changes"] = True
 
@@ -70,9 +98,11 @@ def add_field(field_key: str, idx: int) -> None:
         st.session_state[extra_key] = extras
     tpl = st.session_state.get("template")
     if tpl:
-        layer = tpl["layers"][idx]
-        if not any(f.get("key") == field_key for f in layer.get("fields", [])):
-            layer.setdefault("fields", []).append({"key": field_key, "required": False})
+        index = _field_keys(tpl["layers"][idx], idx)
+        if field_key not in index["keys"]:
+            index["fields"].append({"key": field_key, "required": False})
+            index["keys"].add(field_key)
+            index["len"] += 1
         st.session_state["template"] = tpl
     st.session_state["unsaved_changes"] = True
 
@@ -125,13 +155,14 @@ def persist_suggestions_from_mapping(layer, mapping: dict, source_cols: list[str
     template = st.session_state.get("current_template")
     if template is None:
         return
+    payload: list[dict] = []
     for field in layer.fields:  # type: ignore
         key: str = field.key
         if key.startswith("ADHOC_INFO"):
             continue
         info = mapping.get(key, {})
         if "src" in info:
-            add_suggestion(
+            payload.append(
                 {
                     "template": template,
                     "field": field.key,
@@ -139,20 +170,17 @@ def persist_suggestions_from_mapping(layer, mapping: dict, source_cols: list[str
                     "formula": None,
                     "columns": [info["src"]],
                     "display": info["src"],
-                },
-                headers=source_cols,
+                }
             )
         elif "expr" in info:
-            cols = re.findall(r"df\['([^']+)'\]", info["expr"])
-            add_suggestion(
+            payload.append(
                 {
                     "template": template,
                     "field": field.key,
                     "type": "formula",
                     "formula": info["expr"],
-                    "columns": cols,
+                    "columns": DF_COL_RE.findall(info["expr"]),
                     "display": info.get("expr_display", info["expr"]),
-                },
-                headers=source_cols,
+                }
             )
-
+    bulk_add_suggestions(payload, headers=source_cols)
@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import json
 import os
-from typing import List
+from typing import List, Tuple
 
 import streamlit as st
 
@@ -40,6 +40,7 @@ def edit_suggestions(filename: str, template_name: str) -> None:
 
     @st.dialog(f"Manage Suggestions – {template_name}", width="large")
     def _dlg() -> None:
+        pending: List[Tuple[str, dict]] = []
         for field in _field_names(tpl, template_name):
             st.subheader(field)
 
@@ -63,33 +64,24 @@ def edit_suggestions(filename: str, template_name: str) -> None:
             for lbl in removed:
                 match = next((d for d in direct if _label(d) == lbl), None)
                 if match:
-                    delete_suggestion(
-                        template_name,
-                        field,
-                        columns=match.get("columns"),
+                    pending.append(
+                        ("del", {"field": field, "columns": match.get("columns")})
                     )
-                    st.session_state["suggestions_dialog_open"] = (
-                        filename,
-                        template_name,
-                    )
-                    st.rerun()
             added = set(new_direct) - set(direct_labels)
             for lbl in added:
                 cols = [c.strip() for c in lbl.split(",") if c.strip()]
-                add_suggestion(
-                    {
-                        "template": template_name,
-                        "field": field,
-                        "type": "direct",
-                        "columns": cols,
-                        "display": lbl,
-                    }
-                )
-                st.session_state["suggestions_dialog_open"] = (
-                    filename,
-                    template_name,
+                pending.append(
+                    (
+                        "add",
+                        {
+                            "template": template_name,
+                            "field": field,
+                            "type": "direct",
+                            "columns": cols,
+                            "display": lbl,
+                        },
+                    )
                 )
-                st.rerun()
 
             formula_labels = [_label(s) for s in formulas]
             new_formulas = st_tags(
@@ -102,33 +94,34 @@ def edit_suggestions(filename: str, template_name: str) -> None:
             for lbl in removed_f:
                 match = next((f for f in formulas if _label(f) == lbl), None)
                 if match:
-                    delete_suggestion(
-                        template_name,
-                        field,
-                        formula=match.get("formula"),
-                    )
-                    st.session_state["suggestions_dialog_open"] = (
-                        filename,
-                        template_name,
+                    pending.append(
+                        ("del", {"field": field, "formula": match.get("formula")})
                     )
-                    st.rerun()
             added_f = set(new_formulas) - set(formula_labels)
             for lbl in added_f:
-                add_suggestion(
-                    {
-                        "template": template_name,
-                        "field": field,
-                        "type": "formula",
-                        "formula": lbl,
-                        "columns": [],
-                        "display": "",
-                    }
-                )
-                st.session_state["suggestions_dialog_open"] = (
-                    filename,
-                    template_name,
+                pending.append(
+                    (
+                        "add",
+                        {
+                            "template": template_name,
+                            "field": field,
+                            "type": "formula",
+                            "formula": lbl,
+                            "columns": [],
+                            "display": "",
+                        },
+                    )
                 )
-                st.rerun()
+
+        # Apply every tag change from this run, then rerun once.
+        if pending:
+            for op, payload in pending:
+                if op == "add":
+                    add_suggestion(payload)
+                else:
+                    delete_suggestion(template_name, **payload)
+            st.session_state["suggestions_dialog_open"] = (filename, template_name)
+            st.rerun()
 
     _dlg()
 
@@ -2,26 +2,88 @@ from __future__ import annotations
 
 import json
 import logging
+import os
+import tempfile
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
+
+try:  # pragma: no cover - optional C-accelerated JSON
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None  # type: ignore[assignment]
 
 USER_PREFS_FILE = Path("data/user_prefs.json")
 logger = logging.getLogger(__name__)
 
+# Process umask, read once at import: os.umask can only be queried by
+# setting it, which would race with other threads at save time.
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+# Identity of the last parsed file and its contents
+_cache: Optional[Tuple[Tuple[Path, int, int, int, int], Dict[str, str]]] = None
+
+
+def _file_key(stat: os.stat_result) -> Tuple[Path, int, int, int, int]:
+    # os.replace always yields a new inode, so an equal-size rewrite within
+    # the filesystem's mtime granularity still changes the key
+    return (USER_PREFS_FILE, stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _loads(raw: bytes) -> Dict[str, str]:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _dumps(data: Dict[str, str]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode()
+
 
 def _load() -> Dict[str, str]:
-    if not USER_PREFS_FILE.exists():
+    global _cache
+    try:
+        stat = USER_PREFS_FILE.stat()
+    except FileNotFoundError:
         return {}
+    key = _file_key(stat)
+    if _cache is not None and _cache[0] == key:
+        return dict(_cache[1])
     try:
-        return json.loads(USER_PREFS_FILE.read_text())
+        data = _loads(USER_PREFS_FILE.read_bytes())
     except json.JSONDecodeError:
         logger.warning("user prefs file %s is not valid JSON", USER_PREFS_FILE)
         return {}
+    _cache = (key, data)
+    return dict(data)
 
 
 def _save(data: Dict[str, str]) -> None:
+    global _cache
     USER_PREFS_FILE.parent.mkdir(exist_ok=True, parents=True)
-    USER_PREFS_FILE.write_text(json.dumps(data, indent=2))
+    # mkstemp creates 0600; keep the existing file's mode, or the mode a
+    # plain open() would have given a new file
+    try:
+        mode = USER_PREFS_FILE.stat().st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    # Write to a sibling temp file and swap it in so readers never see a
+    # half-written file and concurrent writers cannot interleave bytes.
+    fd, tmp = tempfile.mkstemp(
+        dir=USER_PREFS_FILE.parent, prefix=f".{USER_PREFS_FILE.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            if hasattr(os, "fchmod"):
+                os.fchmod(fh.fileno(), mode)
+            fh.write(_dumps(data))
+        os.replace(tmp, USER_PREFS_FILE)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    _cache = (_file_key(USER_PREFS_FILE.stat()), dict(data))
 
 
 def get_last_template(user_email: str) -> Optional[str]:
@@ -30,6 +92,10 @@ def get_last_template(user_email: str) -> Optional[str]:
 
 def set_last_template(user_email: str, template_file: str) -> None:
     data = _load()
+    # Home calls this on every rerun with the current selection; only a real
+    # change is worth a write.
+    if data.get(user_email) == (template_file or None):
+        return
     if template_file:
         data[user_email] = template_file
     else:
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import os
+import re
 import time
 import json
 import logging
-from functools import wraps
-from typing import Optional, Set
+from functools import lru_cache, wraps
+from typing import FrozenSet, Optional
 
 import streamlit as st
 
@@ -55,11 +56,14 @@ try:
 except Exception:
     def load_dotenv() -> bool:  # type: ignore
         return False
-load_dotenv()
+# Deployments that inject env vars directly can skip the .env search/parse
+if os.environ.get("DISABLE_DOTENV") != "1":
+    load_dotenv()
 
 # -----------------------------
 # Config helpers
 # -----------------------------
+@lru_cache(maxsize=None)  # env/secrets are fixed for the life of the process
 def _get_config(name: str, default: Optional[str] = None) -> Optional[str]:
     val = os.environ.get(name)
     if val is not None:
@@ -70,6 +74,12 @@ def _get_config(name: str, default: Optional[str] = None) -> Optional[str]:
         return default
 
 
+def _csv_set(name: str, default: str = "") -> FrozenSet[str]:
+    """Split a comma-separated setting into its non-empty, stripped items."""
+    raw = _get_config(name, default) or ""
+    return frozenset(item for item in (t.strip() for t in raw.split(",")) if item)
+
+
 # -----------------------------
 # Settings & toggles
 # -----------------------------
@@ -79,18 +89,23 @@ CLIENT_ID = _get_config("AAD_CLIENT_ID")
 TENANT_ID = _get_config("AAD_TENANT_ID")
 REDIRECT_URI = _get_config("AAD_REDIRECT_URI")  # SPA redirect (exact match; can include ?msal=popup)
 
-EMPLOYEE_GROUP_IDS: Set[str] = {
-    g.strip() for g in (_get_config("AAD_EMPLOYEE_GROUP_IDS", "") or "").split(",") if g.strip()
-}
-EMPLOYEE_DOMAINS: Set[str] = {
-    d.strip().lower() for d in (_get_config("AAD_EMPLOYEE_DOMAINS", "ksmcpa.com,ksmta.com") or "").split(",") if d.strip()
-}
-KSMTA_GROUP_IDS: Set[str] = {
-    g.strip() for g in (_get_config("AAD_KSMTA_GROUP_IDS", "") or "").split(",") if g.strip()
-}
-ADMIN_GROUP_IDS: Set[str] = {
-    g.strip() for g in (_get_config("AAD_ADMIN_GROUP_IDS", "") or "").split(",") if g.strip()
-}
+EMPLOYEE_GROUP_IDS: FrozenSet[str] = _csv_set("AAD_EMPLOYEE_GROUP_IDS")
+EMPLOYEE_DOMAINS: FrozenSet[str] = frozenset(
+    d.lower() for d in _csv_set("AAD_EMPLOYEE_DOMAINS", "ksmcpa.com,ksmta.com")
+)
+# str.endswith takes a tuple and checks every suffix in one C call
+_EMPLOYEE_DOMAIN_SUFFIXES = tuple(EMPLOYEE_DOMAINS)
+KSMTA_GROUP_IDS: FrozenSet[str] = _csv_set("AAD_KSMTA_GROUP_IDS")
+ADMIN_GROUP_IDS: FrozenSet[str] = _csv_set("AAD_ADMIN_GROUP_IDS")
+
+_NO_GROUPS: FrozenSet[str] = frozenset()
+
+# Session keys written on sign-in and removed again on sign-out
+_AUTH_SESSION_KEYS: FrozenSet[str] = frozenset({
+    "user_email", "user_name", "groups",
+    "is_employee", "is_ksmta", "is_admin",
+    "id_token", "token_acquired_at",
+})
 
 if not DISABLE_AUTH:
     missing = [k for k, v in {
@@ -119,55 +134,37 @@ if DISABLE_AUTH:
         st.session_state.update(
             user_email=email,
             user_name=name,
-            groups=set(),
+            groups=_NO_GROUPS,
             is_employee=True,
             is_ksmta=True,
             is_admin=True,
             id_token="DEV_MODE",
-            token_acquired_at=time.time(),
+            token_acquired_at=0.0,  # the dev token never goes stale
         )
 
-    def _require_login_dev(func):
+    def _require_dev(func):
+        # Dev users hold every role, so all four gates share one wrapper
         @wraps(func)
         def wrapper(*args, **kwargs):
             _ensure_user_dev()
             return func(*args, **kwargs)
         return wrapper
 
-    def _require_employee_dev(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            _ensure_user_dev()
-            return func(*args, **kwargs)
-        return wrapper
-
-    def _require_admin_dev(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            _ensure_user_dev()
-            return func(*args, **kwargs)
-        return wrapper
-
-    def _require_ksmta_dev(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            _ensure_user_dev()
-            return func(*args, **kwargs)
-        return wrapper
+    def _do_dev_logout() -> None:
+        # Runs as an on_click callback, i.e. before the rerun the click
+        # already triggers, so no explicit st.rerun() is needed.
+        ss = st.session_state
+        for k in _AUTH_SESSION_KEYS:
+            if k in ss:  # delete only what is present; no pop() default
+                del ss[k]
+        if st.query_params:  # skip the URL rewrite when there is nothing to clear
+            st.query_params.clear()
 
     def _logout_button_dev() -> None:
         with st.sidebar:
             if hasattr(st.sidebar, "divider"):
                 st.sidebar.divider()
-            if st.button("Sign out (dev)"):
-                for k in [
-                    "user_email", "user_name", "groups",
-                    "is_employee", "is_ksmta", "is_admin",
-                    "id_token", "token_acquired_at",
-                ]:
-                    st.session_state.pop(k, None)
-                st.query_params.clear()
-                st.rerun()
+            st.button("Sign out (dev)", on_click=_do_dev_logout)
 
     def _get_user_email_dev() -> Optional[str]:
         return st.session_state.get("user_email")
@@ -177,10 +174,10 @@ if DISABLE_AUTH:
         return st.session_state.get("user_email")
 
     # Rebind public API
-    require_login = _require_login_dev
-    require_employee = _require_employee_dev
-    require_admin = _require_admin_dev
-    require_ksmta = _require_ksmta_dev
+    require_login = _require_dev
+    require_employee = _require_dev
+    require_admin = _require_dev
+    require_ksmta = _require_dev
     logout_button = _logout_button_dev
     get_user_email = _get_user_email_dev
     ensure_user_email = _ensure_user_email_dev
@@ -195,120 +192,326 @@ else:
     from urllib.parse import quote
 
     # --- Official Microsoft "Sign in with Microsoft" button assets (light/dark)
-    MS_SIGNIN_SVG_LIGHT = (
+    # Override with a local copy (e.g. "./app/static/ms-signin-light.svg" with
+    # server.enableStaticServing, or a data: URI) to keep the login screen off
+    # external hosts.
+    MS_SIGNIN_SVG_LIGHT = _get_config(
+        "MS_SIGNIN_SVG_LIGHT",
         "https://learn.microsoft.com/en-us/entra/identity-platform/media/howto-add-branding-in-apps/"
-        "ms-symbollockup_signin_light.svg"
+        "ms-symbollockup_signin_light.svg",
     )
-    MS_SIGNIN_SVG_DARK = (
+    MS_SIGNIN_SVG_DARK = _get_config(
+        "MS_SIGNIN_SVG_DARK",
         "https://raw.githubusercontent.com/MicrosoftDocs/entra-docs/main/docs/identity-platform/media/"
-        "howto-add-branding-in-apps/ms-symbollockup_signin_dark.svg"
+        "howto-add-branding-in-apps/ms-symbollockup_signin_dark.svg",
     )
 
-    AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}".rstrip("/")
+    AUTHORITY_HOST = "login.microsoftonline.com"
+    AUTHORITY = f"https://{AUTHORITY_HOST}/{TENANT_ID}".rstrip("/")
     SCOPES = ["openid", "profile", "email", "User.Read"]
 
+    # MSAL.js config for the popup component; fixed for the process, so
+    # built once instead of on every login-page rerun (treat as read-only)
+    _MSAL_AUTH = {
+        "clientId": CLIENT_ID,
+        "authority": AUTHORITY,
+        # Trusting the host up front skips MSAL.js instance discovery
+        "knownAuthorities": [AUTHORITY_HOST],
+        "redirectUri": REDIRECT_URI,
+        "postLogoutRedirectUri": REDIRECT_URI,
+    }
+    _MSAL_CACHE = {"cacheLocation": "localStorage", "storeAuthStateInCookie": False}
+    _MSAL_LOGIN_REQUEST = {"scopes": SCOPES, "prompt": "select_account"}
+
+    # ID-token claims that may carry the user's address, in priority order
+    _EMAIL_CLAIMS = ("preferred_username", "email", "upn")
+
     # Tune these if your msal button has extra padding inside its iframe
     OVERLAY_OFFSET_X = 20   # px from iframe left
     OVERLAY_OFFSET_Y = 18   # px from iframe top
     TEXT_LEFT_OFFSET_PX = OVERLAY_OFFSET_X
 
-    def _aad_logout_url() -> str:
-        base = f"{AUTHORITY}/oauth2/v2.0/logout"
-        # post_logout_redirect_uri must be one of your SPA Redirect URIs in Azure
-        return f"{base}?post_logout_redirect_uri={quote(REDIRECT_URI, safe='')}"
+    # st.columns cells: current Streamlit uses "stColumn", older releases "column"
+    _COLUMN_SELECTOR = '[data-testid="stColumn"],[data-testid="column"]'
 
-    def _inject_component_centering_css() -> None:
-        if st.session_state.get("_center_css_done"):
-            return
-        st.session_state["_center_css_done"] = True
-        st.markdown(
-            """
-            <style>
-            div[data-testid="stComponent"] {
-                display: flex;
-                justify-content: center;
-            }
-            div[data-testid="stComponent"] > iframe {
-                max-width: 100%;
-                margin: 0 auto;
-                display: block;
-            }
-            </style>
-            """,
-            unsafe_allow_html=True,
-        )
+    # post_logout_redirect_uri must be one of your SPA Redirect URIs in Azure
+    _AAD_LOGOUT_URL = (
+        f"{AUTHORITY}/oauth2/v2.0/logout"
+        f"?post_logout_redirect_uri={quote(REDIRECT_URI, safe='')}"
+    )
 
+    def _aad_logout_url() -> str:
+        return _AAD_LOGOUT_URL
+
+    _JS_LINE_COMMENT = re.compile(r"^[ \t]*//[^\n]*\n?", re.M)
+    # trailing "// ..." after a statement; string literals never follow ; { }
+    _JS_TRAILING_COMMENT = re.compile(r"(?<=[;{}])[ \t]+//[^\n]*")
+    _JS_INDENT = re.compile(r"\n\s*")  # indentation and any blank lines after it
+
+    def _compact_script(html: str) -> str:
+        """Drop comments, indentation and blank lines from an inline script.
+
+        Newlines are kept so automatic semicolon insertion still applies.
+        """
+        html = _JS_LINE_COMMENT.sub("", html)
+        html = _JS_TRAILING_COMMENT.sub("", html)
+        return _JS_INDENT.sub("\n", html).strip()
+
+    def _build_overlay_html(svg_url: str) -> str:
+        """Script that lays the official sign-in artwork over the MSAL button."""
+        return f"""
+        <script>
+        (function () {{
+            var PD = window.parent.document;
+            var selfFrame = window.frameElement;
+
+            // Ensure a single overlay <img> in parent
+            var ov = PD.getElementById('ksm_msal_overlay');
+            if (!ov) {{
+            ov = PD.createElement('img');
+            ov.id = 'ksm_msal_overlay';
+            ov.alt = 'Sign in with Microsoft';
+            ov.style.position = 'fixed';
+            ov.style.zIndex = '9999';
+            ov.style.pointerEvents = 'none';  // click passes through to real button
+            ov.style.display = 'none';
+            ov.style.height = '40px';
+            ov.decoding = 'async';
+            PD.body.appendChild(ov);
+            }}
+            // Reruns reuse the existing <img>; only point it at a new asset on change
+            var svgUrl = {json.dumps(svg_url)};
+            if (ov.getAttribute('src') !== svgUrl) ov.src = svgUrl;
+
+            function colOf(el) {{
+            return (el && el.closest && el.closest('{_COLUMN_SELECTOR}')) || null;
+            }}
+
+            // The MSAL iframe is the nearest iframe before ours in the same column.
+            // Resolve it once and reuse it while it stays in the document.
+            var cached = null;
+            function targetIframe() {{
+            if (cached && cached.isConnected) return cached;
+            cached = null;
+            var myCol = colOf(selfFrame);
+            var frames = (myCol || PD).getElementsByTagName('iframe');
+            var idx = Array.prototype.indexOf.call(frames, selfFrame);
+            for (var j = idx - 1; j >= 0; j--) {{
+                if (colOf(frames[j]) === myCol) return (cached = frames[j]);
+            }}
+            return null;
+            }}
+
+            var lastL = null, lastT = null;
+
+            function place() {{
+            try {{
+                var t = targetIframe();
+                // hidden target (offsetParent null): skip the layout read entirely
+                if (!t || t.offsetParent === null) {{
+                    ov.style.display = 'none';
+                    lastL = lastT = null;
+                    return;
+                }}
+
+                watch(t);
+
+                // keep the underlying iframe clickable but invisible
+                if (t.getAttribute('data-ksm-hidden') !== '1') {{
+                    t.style.opacity = '0';
+                    t.setAttribute('data-ksm-hidden', '1');
+                }}
+
+                // one rect read; only touch the overlay's style when it moved
+                var r = t.getBoundingClientRect();
+                var left = r.left + {OVERLAY_OFFSET_X};
+                var top = r.top + {OVERLAY_OFFSET_Y};
+                if (left !== lastL || top !== lastT) {{
+                    ov.style.left = left + 'px';
+                    ov.style.top  = top + 'px';
+                    lastL = left;
+                    lastT = top;
+                }}
+                ov.style.display = 'block';
+            }} catch (e) {{
+                ov.style.display = 'none';
+            }}
+            }}
+
+            var W = window.parent;
+            // A remounted overlay replaces the previous one's observers
+            if (W.__ksmOverlayTeardown) W.__ksmOverlayTeardown();
+            var dead = false;
+
+            // Coalesce bursts of events into at most one place() per frame
+            var rafPending = false;
+            function schedulePlace() {{
+            if (rafPending || dead) return;
+            rafPending = true;
+            W.requestAnimationFrame(function () {{
+                rafPending = false;
+                if (!dead) place();
+            }});
+            }}
+
+            // Let the browser report size/visibility changes of the MSAL iframe
+            // instead of reacting to every DOM mutation on the page
+            var RO = W.ResizeObserver || window.ResizeObserver;
+            var IO = W.IntersectionObserver || window.IntersectionObserver;
+            var ro = RO ? new RO(schedulePlace) : null;
+            var io = IO ? new IO(schedulePlace, {{ root: null, threshold: [0, 1] }}) : null;
+            var observed = null;
+            function watch(t) {{
+            if (t === observed) return;
+            if (observed) {{
+                if (ro) ro.unobserve(observed);
+                if (io) io.unobserve(observed);
+            }}
+            observed = t;
+            if (ro) ro.observe(t);
+            if (io) io.observe(t);
+            }}
+
+            place();
+            // Resize settles in bursts: place once it stops (trailing debounce)
+            var resizeTimer = null;
+            function onResize() {{
+            clearTimeout(resizeTimer);
+            resizeTimer = setTimeout(schedulePlace, 100);
+            }}
+            W.addEventListener('resize', onResize);
+            // passive: the handler never cancels scrolling, so don't block it
+            W.addEventListener('scroll', schedulePlace, {{ capture: true, passive: true }});
+
+            var MO = W.MutationObserver || MutationObserver;
+            var mos = [];
+            function observe(target, opts) {{
+            var mo = new MO(schedulePlace);
+            mo.observe(target, opts);
+            mos.push(mo);
+            }}
+            // The MSAL iframe (re)mounting: watch only our own column
+            var myCol = colOf(selfFrame);
+            if (myCol) observe(myCol, {{ childList: true, subtree: true }});
+            // Reruns add or drop elements above the login columns (stale
+            // elements, warnings), moving the iframe without resizing it.
+            // Watch the enclosing block's direct children and its size.
+            var row = myCol && myCol.parentElement;
+            var block = row && row.parentElement &&
+                row.parentElement.closest('[data-testid="stVerticalBlock"]');
+            if (block) {{
+            observe(block, {{ childList: true }});
+            if (ro) ro.observe(block);
+            }}
+            observe(PD.body, {{ childList: true }});
+
+            // Called by the post-sign-in cleanup so nothing outlives the overlay
+            function teardown() {{
+            dead = true;
+            for (var i = 0; i < mos.length; i++) mos[i].disconnect();
+            if (ro) ro.disconnect();
+            if (io) io.disconnect();
+            clearTimeout(resizeTimer);
+            W.removeEventListener('resize', onResize);
+            W.removeEventListener('scroll', schedulePlace, {{ capture: true }});
+            if (W.__ksmOverlayTeardown === teardown) W.__ksmOverlayTeardown = null;
+            }}
+            W.__ksmOverlayTeardown = teardown;
+        }})();
+        </script>
+        """
+
+    # Offsets and both artwork URLs are fixed, so both variants are built once.
+    # This only saves the formatting: the script is still sent on every
+    # rerun, since it is below Streamlit's 10 KB message-cache threshold.
+    _OVERLAY_HTML_LIGHT = _compact_script(_build_overlay_html(MS_SIGNIN_SVG_LIGHT))
+    _OVERLAY_HTML_DARK = _compact_script(_build_overlay_html(MS_SIGNIN_SVG_DARK))
+
+    # Component-centering CSS and the login headings, sent as one markdown
+    # element. It is re-emitted on every login rerun on purpose: Streamlit drops
+    # elements a rerun does not render again.
+    _LOGIN_HEADER_HTML = f"""
+    <style>
+    div[data-testid="stComponent"] {{
+        display: flex;
+        justify-content: center;
+    }}
+    div[data-testid="stComponent"] > iframe {{
+        max-width: 100%;
+        margin: 0 auto;
+        display: block;
+    }}
+    </style>
+    <div style="margin-left:{TEXT_LEFT_OFFSET_PX}px">
+    <h1 style="margin:0 0 8px 0; white-space:nowrap;">AI Mapping Agent</h1>
+    <h3 style="margin:0 0 16px 0;">Please sign in</h3>
+    </div>
+    """
+
+    # Remove the overlay + unhide any MSAL iframe we hid, then collapse THIS cleanup iframe
+    _REMOVE_OVERLAY_HTML = _compact_script("""
+    <script>
+    (function(){
+        var W = null, PD = null;
+        try {
+        W = window.parent;
+        PD = W && W.document;
+        // Stop the overlay's observers and listeners, then drop its image.
+        // Both run now: a rerun may remove this iframe before deferred work.
+        if (W.__ksmOverlayTeardown) W.__ksmOverlayTeardown();
+        var ov = PD && PD.getElementById('ksm_msal_overlay');
+        if (ov && ov.parentNode) ov.parentNode.removeChild(ov);
+        } catch(e){}
+
+        function run() {
+        try {
+            // Restore opacity on any MSAL iframe we hid earlier
+            var hidden = PD.querySelectorAll('iframe[data-ksm-hidden="1"]');
+            for (var i = 0; i < hidden.length; i++) {
+            hidden[i].style.opacity = '1';
+            hidden[i].removeAttribute('data-ksm-hidden');
+            }
+        } catch(e){}
+        }
+        // Defer until the authenticated page has painted. Scheduled on the
+        // parent window, which outlives this iframe.
+        if (PD) {
+        if (W.requestIdleCallback) W.requestIdleCallback(run, { timeout: 500 });
+        else W.setTimeout(run, 0);
+        }
+
+        // IMPORTANT: collapse this cleanup iframe so it leaves **zero** layout gap
+        try {
+        var me = window.frameElement;      // the <iframe> Streamlit created for this component
+        if (me) {
+            me.style.width = '0';
+            me.style.height = '0';
+            me.style.border = '0';
+            me.style.position = 'absolute';
+            me.style.left = '-9999px';
+        }
+        } catch(e){}
+    })();
+    </script>
+    """)
 
     def _remove_login_overlay_in_parent() -> None:
-        # Remove the overlay + unhide any MSAL iframe we hid, then collapse THIS cleanup iframe
-        import streamlit.components.v1 as components
-
-        components.html(
-            """
-            <script>
-            (function(){
-                try {
-                var PD = window.parent && window.parent.document;
-                if (PD) {
-                    // Remove our overlay image if present
-                    var ov = PD.getElementById('ksm_msal_overlay');
-                    if (ov && ov.parentNode) ov.parentNode.removeChild(ov);
-
-                    // Restore opacity on any MSAL iframe we hid earlier
-                    var hidden = PD.querySelectorAll('iframe[data-ksm-hidden="1"]');
-                    for (var i = 0; i < hidden.length; i++) {
-                    hidden[i].style.opacity = '1';
-                    hidden[i].removeAttribute('data-ksm-hidden');
-                    }
-                }
-                } catch(e){}
-
-                // IMPORTANT: collapse this cleanup iframe so it leaves **zero** layout gap
-                try {
-                var me = window.frameElement;      // the <iframe> Streamlit created for this component
-                if (me) {
-                    me.style.width = '0';
-                    me.style.height = '0';
-                    me.style.border = '0';
-                    me.style.position = 'absolute';
-                    me.style.left = '-9999px';
-                }
-                } catch(e){}
-            })();
-            </script>
-            """,
-            height=0,
-        )
+        components.html(_REMOVE_OVERLAY_HTML, height=0)
 
     def _render_login_ui() -> None:
-        _inject_component_centering_css()
-
         # Make the left column wider so the H1 stays on one line
         # (adjust 3,1,1 if you want it a bit narrower/wider)
         left, center, right = st.columns([3, 1, 1])
 
         with left:
             # Headings: add a small left margin so they align with the button
-            st.markdown(
-                f"""
-                <div style="margin-left:{TEXT_LEFT_OFFSET_PX}px">
-                <h1 style="margin:0 0 8px 0; white-space:nowrap;">AI Mapping Agent</h1>
-                <h3 style="margin:0 0 16px 0;">Please sign in</h3>
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
+            st.markdown(_LOGIN_HEADER_HTML, unsafe_allow_html=True)
 
             # Existing, working MSAL popup button (unchanged)
             token = msal_authentication(
-                auth={
-                    "clientId": CLIENT_ID,
-                    "authority": f"https://login.microsoftonline.com/{TENANT_ID}".rstrip("/"),
-                    "redirectUri": REDIRECT_URI,
-                    "postLogoutRedirectUri": REDIRECT_URI,
-                },
-                cache={"cacheLocation": "localStorage", "storeAuthStateInCookie": False},
-                login_request={"scopes": ["openid", "profile", "email", "User.Read"], "prompt": "select_account"},
+                auth=_MSAL_AUTH,
+                cache=_MSAL_CACHE,
+                login_request=_MSAL_LOGIN_REQUEST,
                 logout_request={},
                 login_button_text="🔒 Sign in with Microsoft",
                 logout_button_text="Sign out",
@@ -317,191 +520,115 @@ else:
 
             # Anchor + overlay (your current working overlay logic) — unchanged except it uses your OVERLAY_OFFSET_* values
             st.markdown("<div id='ksm_msal_sentinel'></div>", unsafe_allow_html=True)
-            theme = (st.get_option("theme.base") or "light").lower()
-            svg_url = MS_SIGNIN_SVG_DARK if theme == "dark" else MS_SIGNIN_SVG_LIGHT
-
-            components.html(
-                f"""
-                <script>
-                (function () {{
-                    var PD = window.parent.document;
-                    var selfFrame = window.frameElement;
-
-                    // Ensure a single overlay <img> in parent
-                    var ov = PD.getElementById('ksm_msal_overlay');
-                    if (!ov) {{
-                    ov = PD.createElement('img');
-                    ov.id = 'ksm_msal_overlay';
-                    ov.alt = 'Sign in with Microsoft';
-                    ov.style.position = 'fixed';
-                    ov.style.zIndex = '9999';
-                    ov.style.pointerEvents = 'none';  // click passes through to real button
-                    ov.style.display = 'none';
-                    ov.style.height = '40px';
-                    PD.body.appendChild(ov);
-                    }}
-                    ov.src = {json.dumps(svg_url)};
-
-                    function colOf(el) {{
-                    while (el && el !== PD.body) {{
-                        if (el.getAttribute && el.getAttribute('data-testid') === 'column') return el;
-                        el = el.parentElement;
-                    }}
-                    return null;
-                    }}
-
-                    function targetIframe() {{
-                    var frames = PD.getElementsByTagName('iframe');
-                    var idx = -1;
-                    for (var i = 0; i < frames.length; i++) {{
-                        if (frames[i] === selfFrame) {{ idx = i; break; }}
-                    }}
-                    if (idx <= 0) return null;
-                    var myCol = colOf(selfFrame);
-                    for (var j = idx - 1; j >= 0; j--) {{
-                        if (colOf(frames[j]) === myCol) return frames[j];
-                    }}
-                    return null;
-                    }}
-
-                    function place() {{
-                    try {{
-                        var t = targetIframe();
-                        if (!t) {{ ov.style.display = 'none'; return; }}
-
-                        // keep the underlying iframe clickable but invisible
-                        t.style.opacity = '0';
-                        t.setAttribute('data-ksm-hidden', '1');
-
-                        var r = t.getBoundingClientRect();
-                        ov.style.display = 'block';
-                        ov.style.left = (r.left + {OVERLAY_OFFSET_X}) + 'px';
-                        ov.style.top  = (r.top  + {OVERLAY_OFFSET_Y}) + 'px';
-                    }} catch (e) {{
-                        ov.style.display = 'none';
-                    }}
-                    }}
-
-                    place();
-                    window.parent.addEventListener('resize', place);
-                    window.parent.addEventListener('scroll', place, true);
-                    var MO = window.parent.MutationObserver || MutationObserver;
-                    new MO(place).observe(PD.body, {{ childList: true, subtree: true }});
-                }})();
-                </script>
-                """,
-                height=0,
-            )
+            # Pick the themed overlay once per session; the popup flow reruns
+            # this page repeatedly and get_option walks the config tree
+            overlay_html = st.session_state.get("_ksm_overlay_html")
+            if overlay_html is None:
+                theme = (st.get_option("theme.base") or "light").lower()
+                overlay_html = _OVERLAY_HTML_DARK if theme == "dark" else _OVERLAY_HTML_LIGHT
+                st.session_state["_ksm_overlay_html"] = overlay_html
+
+            components.html(overlay_html, height=0)
+            st.session_state["_overlay_mounted"] = True
+
+        # The component returns None until sign-in completes, then a dict
+        try:
+            id_token = token["idToken"]
+        except (TypeError, KeyError):
+            id_token = None
 
         # Success path: remove overlay and persist claims (unchanged)
-        if isinstance(token, dict) and token.get("idToken"):
+        if id_token:
             _remove_login_overlay_in_parent()
             claims = token.get("idTokenClaims") or {}
-            groups = set(claims.get("groups", []))
-            email = (
-                claims.get("preferred_username")
-                or claims.get("email")
-                or claims.get("upn")
-                or ""
-            )
-            domain = email.split("@")[-1].lower() if "@" in email else ""
-            is_employee = bool(groups & EMPLOYEE_GROUP_IDS) or any(
-                domain.endswith(d) for d in EMPLOYEE_DOMAINS
-            )
+            claim = claims.get
+            # frozenset() of a frozenset is a no-op, so a missing claim allocates nothing
+            groups = frozenset(claim("groups") or _NO_GROUPS)
+            email = next((v for k in _EMAIL_CLAIMS if (v := claim(k))), "")
+            # isdisjoint stops at the first shared id and, between two sets,
+            # walks the smaller one; no intersection set is built.
+            is_employee = not groups.isdisjoint(EMPLOYEE_GROUP_IDS)
+            if not is_employee:
+                # Only fall back to the email domain when no group matched
+                _, at, domain = email.rpartition("@")
+                is_employee = bool(at) and domain.lower().endswith(_EMPLOYEE_DOMAIN_SUFFIXES)
 
             st.session_state.update(
                 user_email=email,
-                user_name=claims.get("name", ""),
+                user_name=claim("name", ""),
                 groups=groups,
                 is_employee=is_employee,
-                is_ksmta=bool(groups & KSMTA_GROUP_IDS),
-                is_admin=bool(groups & ADMIN_GROUP_IDS),
-                id_token=token.get("idToken"),
-                token_acquired_at=time.time(),
+                is_ksmta=not groups.isdisjoint(KSMTA_GROUP_IDS),
+                is_admin=not groups.isdisjoint(ADMIN_GROUP_IDS),
+                id_token=id_token,
+                # monotonic: only compared against this process's clock
+                token_acquired_at=time.monotonic(),
             )
             st.rerun()
 
         st.stop()
 
     def _ensure_user_real() -> None:
-        # If already authenticated, remove any leftover overlay and return
-        if st.session_state.get("user_email") and st.session_state.get("id_token"):
-            _remove_login_overlay_in_parent()
+        # If already authenticated, remove any leftover overlay (once) and return
+        ss = st.session_state
+        if ss.get("user_email") and ss.get("id_token"):
+            # The cleanup edits the parent document, so its effect outlives the
+            # component; mount it only after an overlay was actually placed.
+            if ss.pop("_overlay_mounted", False):
+                _remove_login_overlay_in_parent()
             return
         _render_login_ui()
 
-    def _require_login_real(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            _ensure_user_real()
-            return func(*args, **kwargs)
-        return wrapper
-
-    def _require_employee_real(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            _ensure_user_real()
-            if not st.session_state.get("is_employee", False):
-                st.error("🚫 KSM employees only.")
-                st.stop()
-            return func(*args, **kwargs)
-        return wrapper
-
-    def _require_admin_real(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            _ensure_user_real()
-            if not st.session_state.get("is_admin", False):
-                st.error("🚫 Admins only.")
-                st.stop()
-            return func(*args, **kwargs)
-        return wrapper
-
-    def _require_ksmta_real(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            _ensure_user_real()
-            if not st.session_state.get("is_ksmta", False):
-                st.error("🚫 KSMTA members only.")
-                st.stop()
-            return func(*args, **kwargs)
-        return wrapper
+    def _require_role(flag: Optional[str], message: str = ""):
+        """Build a decorator that signs the user in and, if given, checks ``flag``."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                _ensure_user_real()
+                if flag is not None and not st.session_state.get(flag, False):
+                    st.error(message)
+                    st.stop()
+                return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    _require_login_real = _require_role(None)
+    _require_employee_real = _require_role("is_employee", "🚫 KSM employees only.")
+    _require_admin_real = _require_role("is_admin", "🚫 Admins only.")
+    _require_ksmta_real = _require_role("is_ksmta", "🚫 KSMTA members only.")
+
+    # REDIRECT_URI is fixed for the process, so the script is rendered once
+    _CLEAR_STORAGE_HTML = _compact_script(f"""
+    <script>
+      (function() {{
+        try {{
+          // Remove any login overlay before reload
+          var PD = window.parent && window.parent.document;
+          if (PD) {{
+            var ov = PD.getElementById('ksm_msal_overlay');
+            if (ov && ov.parentNode) ov.parentNode.removeChild(ov);
+          }}
+        }} catch(e) {{}}
+        // Drop every key (MSAL's cache included) in one call per storage
+        ['localStorage','sessionStorage'].forEach(function(storeName){{
+          try {{
+            var store = window[storeName];
+            if (store) store.clear();
+          }} catch (e) {{}}
+        }});
+        var u = new URL({json.dumps(REDIRECT_URI)}, window.location.href);
+        u.searchParams.set('logoutts', Date.now().toString());
+        if (window.top) window.top.location.href = u.toString();
+        else window.location.href = u.toString();
+      }})();
+    </script>
+    """)
 
     def _clear_storage_and_reload() -> None:
         """Clear both storages and hard-navigate to the SPA redirect."""
-        components.html(
-            f"""
-            <script>
-              (function() {{
-                try {{
-                  // Remove any login overlay before reload
-                  var PD = window.parent && window.parent.document;
-                  if (PD) {{
-                    var ov = PD.getElementById('ksm_msal_overlay');
-                    if (ov && ov.parentNode) ov.parentNode.removeChild(ov);
-                  }}
-                }} catch(e) {{}}
-                try {{
-                  ['localStorage','sessionStorage'].forEach(function(storeName){{
-                    var store = window[storeName];
-                    if (!store) return;
-                    var keys = [];
-                    for (var i = 0; i < store.length; i++) {{
-                      var k = store.key(i);
-                      if (k) keys.push(k);
-                    }}
-                    keys.forEach(function(k) {{ try {{ store.removeItem(k); }} catch(e){{}} }});
-                  }});
-                }} catch (e) {{}}
-                var u = new URL({json.dumps(REDIRECT_URI)}, window.location.href);
-                u.searchParams.set('logoutts', Date.now().toString());
-                if (window.top) window.top.location.href = u.toString();
-                else window.location.href = u.toString();
-              }})();
-            </script>
-            """,
-            height=0,
-        )
+        components.html(_CLEAR_STORAGE_HTML, height=0)
+
+    _LOGOUT_KEYS = _AUTH_SESSION_KEYS | {"_overlay_mounted"}
 
     def _logout_button_real() -> None:
         if "user_email" not in st.session_state or not st.session_state.get("id_token"):
@@ -511,13 +638,12 @@ else:
                 st.sidebar.divider()
             if st.button("Sign out", type="primary", use_container_width=True, key="ksm_logout"):
                 # Clear server state first, then client-side wipe + reload (no st.rerun()).
-                for k in [
-                    "user_email", "user_name", "groups",
-                    "is_employee", "is_ksmta", "is_admin",
-                    "id_token", "token_acquired_at", "_center_css_done",
-                ]:
-                    st.session_state.pop(k, None)
-                st.query_params.clear()
+                ss = st.session_state
+                for k in _LOGOUT_KEYS:
+                    if k in ss:
+                        del ss[k]
+                if st.query_params:
+                    st.query_params.clear()
                 _clear_storage_and_reload()
                 st.stop()
 
@@ -525,11 +651,12 @@ else:
         return st.session_state.get("user_email")
 
     def _ensure_user_email_real() -> Optional[str]:
-        email = st.session_state.get("user_email")
+        ss = st.session_state
+        email = ss.get("user_email")
         if email:
             return email
         _ensure_user_real()
-        return st.session_state.get("user_email")
+        return ss.get("user_email")
 
     # Rebind public API
     require_login = _require_login_real
@@ -6,6 +6,7 @@ import streamlit as st
 from app_utils.excel_utils import read_tabular_file
 from app_utils.mapping.computed_layer import gpt_formula_suggestion
 from app_utils.ui.expression_builder import build_expression
+from app_utils.ui_utils import mark_layer_confirmed
 from contextlib import nullcontext
 from schemas.template_v2 import Template
 
@@ -130,5 +131,5 @@ def render(layer: Template, idx: int) -> None:
         disabled=not result.get("resolved"),
         key=f"confirm_{idx}",
     ):
-        st.session_state[f"layer_confirmed_{idx}"] = True
+        mark_layer_confirmed(st.session_state, idx)
         st.rerun()
@@ -18,7 +18,7 @@ from app_utils.ui.header_utils import (
     remove_formula,
     persist_suggestions_from_mapping,
 )
-from app_utils.ui_utils import set_steps_from_template
+from app_utils.ui_utils import mark_layer_confirmed, set_steps_from_template
 import uuid
 import hashlib
 
@@ -328,7 +328,7 @@ def render(layer, idx: int) -> None:
             k: v for k, v in mapping.items() if k not in BLOCKED_FIELDS
         }
         persist_suggestions_from_mapping(layer, filtered_mapping, source_cols)
-        st.session_state[f"layer_confirmed_{idx}"] = True
+        mark_layer_confirmed(st.session_state, idx)
         st.rerun()
 
     # Offer mapped CSV download for current state
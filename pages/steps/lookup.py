@@ -15,6 +15,7 @@ import pandas as pd
 from app_utils.mapping_utils import match_lookup_values
 from app_utils.mapping.lookup_layer import gpt_lookup_completion
 from app_utils.excel_utils import read_tabular_file
+from app_utils.ui_utils import mark_layer_confirmed
 from schemas.template_v2 import Template
 
 
@@ -109,5 +110,5 @@ def render(layer, idx: int):
         disabled=bool(unmapped),
         key=f"confirm_{idx}",
     ):
-        st.session_state[f"layer_confirmed_{idx}"] = True
+        mark_layer_confirmed(st.session_state, idx)
         st.rerun()
@@ -0,0 +1,21 @@
+import importlib
+import sys
+
+import pytest
+import streamlit as st
+
+
+def test_csv_settings_are_split_and_stripped(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("DISABLE_AUTH", "1")
+    monkeypatch.setenv("AAD_ADMIN_GROUP_IDS", " a , ,b,a ")
+    monkeypatch.setenv("AAD_EMPLOYEE_DOMAINS", "KSMTA.com, example.org")
+    st.session_state.clear()
+    sys.modules.pop("auth", None)
+    auth = importlib.import_module("auth")
+    try:
+        assert auth.ADMIN_GROUP_IDS == frozenset({"a", "b"})
+        assert auth.EMPLOYEE_DOMAINS == frozenset({"ksmta.com", "example.org"})
+        assert auth.KSMTA_GROUP_IDS == frozenset()
+    finally:
+        st.session_state.clear()
+        sys.modules.pop("auth", None)
@@ -0,0 +1,39 @@
+import importlib
+import sys
+import types
+import pytest
+
+
+def test_overlay_cleanup_only_after_overlay(monkeypatch: pytest.MonkeyPatch) -> None:
+    html_calls: list[str] = []
+    components_v1 = types.ModuleType("streamlit.components.v1")
+    components_v1.html = lambda html, **k: html_calls.append(html)
+    components = types.ModuleType("streamlit.components")
+    components.v1 = components_v1
+    st = types.ModuleType("streamlit")
+    st.session_state = {"user_email": "x", "id_token": "tok"}
+    st.secrets = {}
+    monkeypatch.setitem(sys.modules, "streamlit", st)
+    monkeypatch.setitem(sys.modules, "streamlit.components", components)
+    monkeypatch.setitem(sys.modules, "streamlit.components.v1", components_v1)
+    monkeypatch.setitem(
+        sys.modules,
+        "msal_streamlit_t2",
+        types.SimpleNamespace(msal_authentication=lambda **_: None),
+    )
+    monkeypatch.setenv("DISABLE_AUTH", "0")
+    monkeypatch.setenv("AAD_CLIENT_ID", "x")
+    monkeypatch.setenv("AAD_TENANT_ID", "x")
+    monkeypatch.setenv("AAD_REDIRECT_URI", "x")
+
+    auth = importlib.import_module("auth")
+    importlib.reload(auth)
+
+    auth._ensure_user_real()
+    assert html_calls == []  # no overlay was placed this session
+
+    st.session_state["_overlay_mounted"] = True
+    auth._ensure_user_real()
+    auth._ensure_user_real()
+    assert html_calls == [auth._REMOVE_OVERLAY_HTML]
+    assert "_overlay_mounted" not in st.session_state
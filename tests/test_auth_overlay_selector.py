@@ -0,0 +1,39 @@
+import importlib
+import sys
+import types
+
+import pytest
+
+
+def _load_real_auth(monkeypatch: pytest.MonkeyPatch):
+    components_v1 = types.ModuleType("streamlit.components.v1")
+    components_v1.html = lambda html, **k: None
+    components = types.ModuleType("streamlit.components")
+    components.v1 = components_v1
+    st = types.ModuleType("streamlit")
+    st.session_state = {}
+    st.secrets = {}
+    monkeypatch.setitem(sys.modules, "streamlit", st)
+    monkeypatch.setitem(sys.modules, "streamlit.components", components)
+    monkeypatch.setitem(sys.modules, "streamlit.components.v1", components_v1)
+    monkeypatch.setitem(
+        sys.modules,
+        "msal_streamlit_t2",
+        types.SimpleNamespace(msal_authentication=lambda **_: None),
+    )
+    monkeypatch.setenv("DISABLE_AUTH", "0")
+    monkeypatch.setenv("AAD_CLIENT_ID", "x")
+    monkeypatch.setenv("AAD_TENANT_ID", "x")
+    monkeypatch.setenv("AAD_REDIRECT_URI", "x")
+    auth = importlib.import_module("auth")
+    return importlib.reload(auth)
+
+
+def test_overlay_column_selector_matches_current_testid(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    auth = _load_real_auth(monkeypatch)
+    assert '[data-testid="stColumn"]' in auth._COLUMN_SELECTOR.split(",")
+    for html in (auth._OVERLAY_HTML_LIGHT, auth._OVERLAY_HTML_DARK):
+        assert f"closest('{auth._COLUMN_SELECTOR}')" in html
+        assert "closest('[data-testid=\"column\"]')" not in html
@@ -0,0 +1,53 @@
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from app_utils.dataframe_numeric import eval_formula
+
+
+def test_eval_formula_numeric_fast_path_keeps_index_and_dtype():
+    df = pd.DataFrame({"A": [1, 2], "B": [3.0, 0.0]}, index=[10, 11])
+    res = eval_formula("df['A'] * 2 + df['B']", df)
+    assert isinstance(res, pd.Series)
+    assert list(res.index) == [10, 11]
+    assert res.tolist() == [5.0, 4.0]
+    assert eval_formula("df['A'] * 2", df).dtype == "int64"
+
+
+def test_eval_formula_falls_back_for_text_and_methods():
+    df = pd.DataFrame({"A": ["x", "y"], "B": [1.0, None]})
+    assert eval_formula("df['A'] + '!'", df).tolist() == ["x!", "y!"]
+    assert eval_formula("df['B'].fillna(0)", df).tolist() == [1.0, 0.0]
+
+
+def _pandas(expr: str, df: pd.DataFrame):
+    return eval(expr, {"df": df})  # noqa: S307
+
+
+def test_eval_formula_reductions_match_pandas_with_nan():
+    df = pd.DataFrame({"A": [1.0, None, 2.0, 4.0], "B": [1, 2, 3, 4]})
+    for expr in (
+        "df['A'].sum()",
+        "df['A'].mean()",
+        "df['A'].max()",
+        "df['A'].std()",
+        "df['B'].var()",
+    ):
+        assert eval_formula(expr, df) == pytest.approx(_pandas(expr, df), nan_ok=True)
+    for expr in ("df['A'].cumsum()", "df['A'].sum() + df['B']"):
+        pdt.assert_series_equal(eval_formula(expr, df), _pandas(expr, df))
+
+
+def test_eval_formula_division_by_zero_matches_pandas():
+    df = pd.DataFrame({"A": [1, 0, -3], "B": [0, 0, 2], "C": [None, 1.0, 0.0]})
+    for expr in (
+        "df['A'] / df['B']",
+        "df['A'] / 0",
+        "df['C'] / df['B']",
+        "df['A'] // df['B']",
+        "df['A'] % df['B']",
+        "(df['A'] + df['C']) / df['C']",
+    ):
+        pdt.assert_series_equal(
+            eval_formula(expr, df), _pandas(expr, df), check_names=False
+        )
@@ -49,6 +49,9 @@ class DummyStreamlit:
     def rerun(self) -> None:  # pragma: no cover - trivial
         pass
 
+    def container(self, *a: Any, **k: Any) -> DummyColumn:
+        return DummyColumn(False)
+
     def columns(self, spec: Any) -> List[DummyColumn]:
         if isinstance(spec, int):
             return [DummyColumn(False), DummyColumn(True)]
@@ -91,3 +94,78 @@ def test_preview_coerces_numeric_strings(monkeypatch) -> None:
     results = dummy.last_dataframe["Result"].tolist()
     assert results == pytest.approx([4.0, 6.28])
     assert dummy.last_dataframe["Result"].dtype.kind in {"f", "i"}
+
+
+def test_preview_reused_when_expression_unchanged(monkeypatch) -> None:
+    class NoSaveStreamlit(DummyStreamlit):
+        def columns(self, spec: Any) -> List[DummyColumn]:
+            n = spec if isinstance(spec, int) else len(spec)
+            return [DummyColumn(False) for _ in range(n)]
+
+    dummy = NoSaveStreamlit()
+    dummy.session_state["current_template"] = "Demo"
+    dummy.session_state["Total_expr_text"] = "df['A'] * 2"
+    monkeypatch.setitem(sys.modules, "streamlit", dummy)
+    sys.modules.pop("app_utils.ui.formula_dialog", None)
+    mod = importlib.import_module("app_utils.ui.formula_dialog")
+    evals: list[str] = []
+    orig = mod.eval_formula
+    monkeypatch.setattr(
+        mod, "eval_formula", lambda e, d: (evals.append(e), orig(e, d))[1]
+    )
+    df = pd.DataFrame({"A": [1, 2]})
+
+    mod.open_formula_dialog(df, "Total")
+    mod.open_formula_dialog(df, "Total")
+    assert evals == ["df['A'] * 2"]
+    assert dummy.last_dataframe["Result"].tolist() == [2, 4]
+
+    dummy.session_state["Total_expr_text"] = "df['A'] * 3"
+    mod.open_formula_dialog(df, "Total")
+    assert len(evals) == 2
+    assert dummy.last_dataframe["Result"].tolist() == [3, 6]
+
+
+def test_preview_recomputed_for_new_data_same_shape(monkeypatch) -> None:
+    class NoSaveStreamlit(DummyStreamlit):
+        def columns(self, spec: Any) -> List[DummyColumn]:
+            n = spec if isinstance(spec, int) else len(spec)
+            return [DummyColumn(False) for _ in range(n)]
+
+    dummy = NoSaveStreamlit()
+    dummy.session_state["current_template"] = "Demo"
+    dummy.session_state["Total_expr_text"] = "df['A'] * 2"
+    monkeypatch.setitem(sys.modules, "streamlit", dummy)
+    sys.modules.pop("app_utils.ui.formula_dialog", None)
+    mod = importlib.import_module("app_utils.ui.formula_dialog")
+
+    mod.open_formula_dialog(pd.DataFrame({"A": [1, 2]}), "Total")
+    assert dummy.last_dataframe["Result"].tolist() == [2, 4]
+    mod.open_formula_dialog(pd.DataFrame({"A": [100, 200]}), "Total")
+    assert dummy.last_dataframe["Result"].tolist() == [200, 400]
+
+
+def test_preview_reductions_use_full_frame(monkeypatch) -> None:
+    df = pd.DataFrame({"A": range(500)})
+    _, dummy = run_dialog(monkeypatch, "Total", df=df, expr="df['A'].sum()")
+    assert dummy.last_dataframe["Result"].tolist()[0] == sum(range(500))
+
+    _, dummy = run_dialog(monkeypatch, "Total", df=df, expr="df['A'] * 2")
+    assert dummy.last_dataframe["Result"].tolist() == [0, 2, 4, 6, 8]
+
+
+def test_preview_key_hashes_only_referenced_columns(monkeypatch) -> None:
+    _, dummy = run_dialog(monkeypatch, "Total", expr="df['A'].sum()")
+    mod = sys.modules["app_utils.ui.formula_dialog"]
+    hashed: list[list[str]] = []
+    orig = pd.util.hash_pandas_object
+
+    def spy(obj: pd.DataFrame, *a: Any, **k: Any) -> pd.Series:
+        hashed.append(list(obj.columns))
+        return orig(obj, *a, **k)
+
+    monkeypatch.setattr(pd.util, "hash_pandas_object", spy)
+    df = pd.DataFrame({"A": [1, 2], "B": ["x", "y"], "C": [0.5, 1.5]})
+    dummy.session_state["Total_expr_text"] = "df['A'].sum() + df['C']"
+    mod.open_formula_dialog(df, "Total")
+    assert hashed == [["A", "C"]]
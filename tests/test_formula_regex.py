@@ -0,0 +1,7 @@
+from app_utils.formula_regex import DF_COL_RE
+
+
+def test_df_col_re_extracts_and_strips_columns():
+    expr = "df['Total Cost'] / df['Miles']"
+    assert DF_COL_RE.findall(expr) == ["Total Cost", "Miles"]
+    assert DF_COL_RE.sub(r"\1", expr) == "Total Cost / Miles"
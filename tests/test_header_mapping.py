@@ -136,6 +136,28 @@ def test_add_field_sets_unsaved(monkeypatch):
     assert "Extra" in st.session_state[f"header_extra_fields_{idx}"]
 
 
+def test_add_remove_field_keeps_template_fields_unique():
+    idx = 0
+    st.session_state.clear()
+    st.session_state["template"] = {
+        "layers": [{"type": "header", "fields": [{"key": "Name"}]}]
+    }
+    add_field("Extra", idx)
+    add_field("Extra", idx)
+    remove_field("Extra", idx)
+    add_field("Extra", idx)
+    fields = st.session_state["template"]["layers"][0]["fields"]
+    assert [f["key"] for f in fields] == ["Name", "Extra"]
+
+    # a freshly loaded template must not reuse the previous key index
+    st.session_state["template"] = {
+        "layers": [{"type": "header", "fields": [{"key": "Other"}]}]
+    }
+    add_field("Extra", idx)
+    fields = st.session_state["template"]["layers"][0]["fields"]
+    assert [f["key"] for f in fields] == ["Other", "Extra"]
+
+
 def test_add_remove_field_without_template():
     idx = 0
     st.session_state.clear()
@@ -19,7 +19,7 @@ class DummySidebar:
         return True
 
 
-def test_logout_clears_center_css_flag(monkeypatch: pytest.MonkeyPatch) -> None:
+def test_logout_clears_overlay_flag(monkeypatch: pytest.MonkeyPatch) -> None:
     sidebar = DummySidebar()
     components_v1 = types.ModuleType("streamlit.components.v1")
     components_v1.html = lambda *a, **k: None
@@ -27,7 +27,7 @@ def test_logout_clears_center_css_flag(monkeypatch: pytest.MonkeyPatch) -> None:
     components.v1 = components_v1
     st = types.ModuleType("streamlit")
     st.sidebar = sidebar
-    st.session_state = {"user_email": "x", "id_token": "tok", "_center_css_done": True}
+    st.session_state = {"user_email": "x", "id_token": "tok", "_overlay_mounted": True}
     st.secrets = {}
     st.query_params = types.SimpleNamespace(clear=lambda: None)
     st.button = lambda label, **k: sidebar.button(label, **k)
@@ -53,6 +53,6 @@ def test_logout_clears_center_css_flag(monkeypatch: pytest.MonkeyPatch) -> None:
 
     auth.logout_button()
 
-    assert "_center_css_done" not in st.session_state
+    assert "_overlay_mounted" not in st.session_state
     assert "user_email" not in st.session_state
     assert "id_token" not in st.session_state
@@ -292,3 +292,38 @@ def test_skip_adhoc_info(monkeypatch, tmp_path, existing):
     assert json.loads(path.read_text()) == existing
     assert suggestion_store.get_suggestions("Demo", "ADHOC_INFO1") == []
     assert suggestion_store.get_suggestion("Demo", "ADHOC_INFO1") is None
+
+
+def test_bulk_add_suggestions_saves_once(monkeypatch, tmp_path):
+    path = tmp_path / "mapping_suggestions.json"
+    path.write_text("[]")
+    monkeypatch.setenv("SUGGESTION_FILE", str(path))
+    importlib.reload(suggestion_store)
+
+    saves: list[int] = []
+    orig_save = suggestion_store._save
+    monkeypatch.setattr(
+        suggestion_store, "_save", lambda d: (saves.append(1), orig_save(d))
+    )
+    base = {
+        "template": "Demo",
+        "field": "Name",
+        "type": "direct",
+        "formula": None,
+        "columns": ["ColA"],
+        "display": "ColA",
+    }
+    suggestion_store.bulk_add_suggestions(
+        [
+            base,
+            {**base, "field": "City", "columns": ["ColB"], "display": "ColB"},
+            {**base, "field": " name "},
+            {**base, "field": "ADHOC_INFO1"},
+        ],
+        headers=["ColA", "ColB"],
+    )
+
+    saved = json.loads(path.read_text())
+    assert [s["field"] for s in saved] == ["Name", "City"]
+    assert all(s.get("header_id") for s in saved)
+    assert saves == [1]
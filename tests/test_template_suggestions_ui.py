@@ -20,6 +20,7 @@ class DummyStreamlit:
         self.subheaders: list[str] = []
         self.session_state: dict[str, Any] = {}
         self.rerun_called = False
+        self.rerun_count = 0
 
     def dialog(self, *a, **k):
         def wrap(func):
@@ -35,6 +36,7 @@ class DummyStreamlit:
 
     def rerun(self) -> None:  # pragma: no cover - trivial
         self.rerun_called = True
+        self.rerun_count += 1
 
 
 def run_dialog(
@@ -162,6 +164,29 @@ def test_dialog_state_persists_after_removal(monkeypatch, tmp_path):
     assert dummy.rerun_called
 
 
+def test_multiple_tag_changes_rerun_once(monkeypatch, tmp_path):
+    dummy, store = run_dialog(
+        monkeypatch,
+        tmp_path,
+        fields=[{"key": "Name"}, {"key": "City"}],
+        suggestions=[
+            {
+                "template": "Demo",
+                "field": "Name",
+                "type": "direct",
+                "columns": ["ColA"],
+                "display": "ColA",
+            }
+        ],
+        tags_add={"tags_Name": ["ColB", "ColC"], "tags_City": ["Town"]},
+        tags_remove={"tags_Name": ["ColA"]},
+    )
+    names = sorted(s["display"] for s in store.get_suggestions("Demo", "Name"))
+    assert names == ["ColB", "ColC"]
+    assert [s["display"] for s in store.get_suggestions("Demo", "City")] == ["Town"]
+    assert dummy.rerun_count == 1
+
+
 def test_edit_suggestions_skips_adhoc_info_fields(monkeypatch, tmp_path):
     dummy, _ = run_dialog(
         monkeypatch,
@@ -0,0 +1,35 @@
+import streamlit as st
+
+from app_utils import ui_utils
+from app_utils.ui_utils import (
+    compute_current_step,
+    get_steps,
+    mark_layer_confirmed,
+    set_steps_from_template,
+)
+
+
+def test_compute_current_step_counts_marked_layers():
+    st.session_state.clear()
+    assert compute_current_step() == 0
+
+    st.session_state["uploaded_file"] = object()
+    mark_layer_confirmed(st.session_state, 0)
+    mark_layer_confirmed(st.session_state, 1)
+    assert compute_current_step() == 3
+
+    # flags popped elsewhere (reset / back navigation) no longer count
+    st.session_state.pop("layer_confirmed_1")
+    assert compute_current_step() == 2
+    st.session_state.clear()
+
+
+def test_set_steps_is_per_session():
+    st.session_state.clear()
+    assert get_steps() == ["Upload File"]
+
+    set_steps_from_template([{"type": "header"}, {"type": "custom"}])
+    assert get_steps() == ["Upload File", "Map Headers", "Step 2: Custom"]
+    # the legacy module symbol is not rebound by a session's template
+    assert ui_utils.STEPS == ("Upload File",)
+    st.session_state.clear()
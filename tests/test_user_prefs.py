@@ -1,4 +1,7 @@
 import logging
+import os
+
+import pytest
 
 from app_utils import user_prefs
 
@@ -31,3 +34,92 @@ def test_load_malformed_file(tmp_path, monkeypatch, caplog):
 
     with caplog.at_level(logging.WARNING):
         assert user_prefs._load() == {}
+
+
+def test_load_reuses_parse_until_file_changes(tmp_path, monkeypatch):
+    pref = tmp_path / "prefs.json"
+    monkeypatch.setattr(user_prefs, "USER_PREFS_FILE", pref)
+    user_prefs.set_last_template("u@example.com", "demo.json")
+
+    parses: list[str] = []
+    orig_loads = user_prefs._loads
+    monkeypatch.setattr(
+        user_prefs, "_loads", lambda s: (parses.append(s), orig_loads(s))[1]
+    )
+    assert user_prefs.get_last_template("u@example.com") == "demo.json"
+    assert user_prefs.get_last_template("u@example.com") == "demo.json"
+    assert parses == []
+
+    pref.write_text('{"u@example.com": "other.json", "x": "y"}')
+    assert user_prefs.get_last_template("u@example.com") == "other.json"
+
+
+def test_load_detects_same_size_replace_within_mtime(tmp_path, monkeypatch):
+    pref = tmp_path / "prefs.json"
+    monkeypatch.setattr(user_prefs, "USER_PREFS_FILE", pref)
+    user_prefs.set_last_template("u@example.com", "aaaa.json")
+    before = pref.stat()
+
+    # Another process swaps in an equal-size file carrying the same mtime
+    tmp = tmp_path / "new.json"
+    tmp.write_bytes(pref.read_bytes().replace(b"aaaa", b"bbbb"))
+    os.utime(tmp, ns=(before.st_atime_ns, before.st_mtime_ns))
+    os.replace(tmp, pref)
+    assert pref.stat().st_size == before.st_size
+    assert user_prefs.get_last_template("u@example.com") == "bbbb.json"
+
+
+def test_stdlib_fallback_round_trip(tmp_path, monkeypatch):
+    pref = tmp_path / "prefs.json"
+    monkeypatch.setattr(user_prefs, "USER_PREFS_FILE", pref)
+    monkeypatch.setattr(user_prefs, "orjson", None)
+
+    user_prefs.set_last_template("u@example.com", "demo.json")
+    assert pref.read_text() == '{\n  "u@example.com": "demo.json"\n}'
+    monkeypatch.setattr(user_prefs, "_cache", None)
+    assert user_prefs.get_last_template("u@example.com") == "demo.json"
+
+
+def test_save_is_atomic(tmp_path, monkeypatch):
+    pref = tmp_path / "prefs.json"
+    monkeypatch.setattr(user_prefs, "USER_PREFS_FILE", pref)
+    user_prefs.set_last_template("u@example.com", "demo.json")
+
+    def boom(_data):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(user_prefs, "_dumps", boom)
+    try:
+        user_prefs.set_last_template("u@example.com", "other.json")
+    except RuntimeError:
+        pass
+    assert user_prefs.get_last_template("u@example.com") == "demo.json"
+    assert [p.name for p in tmp_path.iterdir()] == ["prefs.json"]
+
+
+def test_unchanged_template_skips_write(tmp_path, monkeypatch):
+    pref = tmp_path / "prefs.json"
+    monkeypatch.setattr(user_prefs, "USER_PREFS_FILE", pref)
+    saves: list[dict] = []
+    orig_save = user_prefs._save
+    monkeypatch.setattr(
+        user_prefs, "_save", lambda d: (saves.append(dict(d)), orig_save(d))
+    )
+
+    user_prefs.set_last_template("u@example.com", "demo.json")
+    user_prefs.set_last_template("u@example.com", "demo.json")
+    user_prefs.set_last_template("other@example.com", "")
+    assert len(saves) == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fchmod"), reason="POSIX file modes")
+def test_save_preserves_file_mode(tmp_path, monkeypatch):
+    pref = tmp_path / "prefs.json"
+    monkeypatch.setattr(user_prefs, "USER_PREFS_FILE", pref)
+
+    user_prefs.set_last_template("u@example.com", "demo.json")
+    assert pref.stat().st_mode & 0o777 == 0o666 & ~user_prefs._UMASK
+
+    pref.chmod(0o640)
+    user_prefs.set_last_template("u@example.com", "other.json")
+    assert pref.stat().st_mode & 0o777 == 0o640